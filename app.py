@@ -3,22 +3,29 @@ Main application file for the Shoe Database.
 This application allows users to manage their shoe collection with CRUD (Create, Read, Update, and Delete) operations.
 """
 
+# Enables line editing and history for input() prompts where GNU readline is available
+try:
+    import readline
+except ImportError:
+    pass  # Not available on Windows; input() works the same without it
+
 # Import custom modules
 from database import get_db_connection, close_db_connection
 from auth import show_login_menu
 from shoe_operations import show_shoe_menu
 
-# Get database connection
-conn, cur = get_db_connection()
 
 def main():
     """Main entry point for the Shoe Database application."""
-    # Bring up the login menu
-    current_user_id = show_login_menu(cur, conn)
+    # Get database connection
+    conn, cur = get_db_connection()
+    
+    # Bring up the login menu (it hands back a fresh connection if the original dropped)
+    current_user_id, conn, cur = show_login_menu(cur, conn)
     
     # If the user successfully logs in, bring up the shoe menu
     if current_user_id is not None:
-        show_shoe_menu(cur, conn, current_user_id)
+        conn, cur = show_shoe_menu(cur, conn, current_user_id)
     
     # Clean up database connections
     close_db_connection(conn, cur)
@@ -3,16 +3,38 @@ Authentication module for the Shoe Database application.
 Handles user registration, login, and validation.
 """
 
+import os
 import bcrypt
 from getpass import getpass
 from validation import get_valid_email
-from psycopg2 import (
-    DatabaseError,      # Base class for all database errors
-    OperationalError,   # Connection issues, server problems
-    IntegrityError,     # Constraint violations (unique, foreign key)
-    DataError,          # Invalid data (wrong type, out of range)
-    ProgrammingError    # SQL syntax errors, wrong table names
-)
+from database import db_operation, reconnect_db
+from psycopg2 import IntegrityError   # Constraint violations (unique, foreign key)
+
+# bcrypt work factor used for new hashes (checkpw reads the cost from the stored hash).
+# Lower it (e.g. BCRYPT_COST=10) in dev/test environments for faster signups.
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", "12"))
+
+# bcrypt silently truncates anything past 72 bytes
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+# Hash checked against when a username doesn't exist, so unknown usernames
+# take as long to reject as wrong passwords. Computing it at import time also
+# warms up bcrypt (extension load, salt RNG) before the first real login or signup.
+_DUMMY_HASH = bcrypt.hashpw(b"x", bcrypt.gensalt(rounds=BCRYPT_COST))
+
+
+def is_valid_password(password_bytes):
+    """
+    Check that a password can be meaningfully hashed by bcrypt.
+    Used to reject bogus input before paying for a full bcrypt key schedule.
+    
+    Args:
+        password_bytes: UTF-8 encoded password
+        
+    Returns:
+        bool: True if the password is non-empty and at most 72 bytes, False otherwise
+    """
+    return 0 < len(password_bytes) <= BCRYPT_MAX_PASSWORD_BYTES
 
 
 def login_user(cur):
@@ -23,47 +45,43 @@ def login_user(cur):
         cur: Database cursor object
         
     Returns:
-        int: User ID of the logged-in user
+        int or None: User ID of the logged-in user, or None if the database connection was lost
     """
     not_logged_in = True
     while not_logged_in:
         username = input("Enter your username: ")
-        password = getpass("Enter your password: ")
+        password = getpass("Enter your password: ").encode("utf-8")
         
-        try:
+        # No stored hash can match an empty or over-long password
+        if not is_valid_password(password):
+            print("Invalid username or password, please try again")
+            continue
+        
+        with db_operation(cur.connection, "log in"):
             # Fetch stored password hash for this username
             cur.execute("SELECT id, password_hash FROM users WHERE username = %s", (username,))
             row = cur.fetchone()
             
             if row is None:
+                # Do the same bcrypt work as a real check to avoid leaking which usernames exist
+                bcrypt.checkpw(password, _DUMMY_HASH)
                 print("Invalid username or password, please try again")
                 continue
                 
             user_id_from_db = row[0]
-            stored_hash = row[1]
+            stored_hash = row[1]  # BYTEA comes back as a memoryview
             
             # Compare entered password against stored hash
-            if bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8")):
+            if bcrypt.checkpw(password, bytes(stored_hash)):
                 print("Login successful, heading to main menu...")
                 not_logged_in = False
                 return user_id_from_db
             else:
                 print("Invalid username or password, please try again")
-                
-        except OperationalError as e:
-            print(f"❌ Database connection error: {e}")
-            print("Unable to login. Please try again.")
-            continue
-            
-        except ProgrammingError as e:
-            print(f"❌ Query error: {e}")
-            print("Unable to login. Please try again.")
-            continue
-            
-        except Exception as e:
-            print(f"❌ Unexpected error during login: {e}")
-            print("Please try again.")
-            continue
+        
+        # Retrying on a dead connection can't succeed; let the login menu reconnect
+        if cur.connection.closed:
+            return None
 
 
 def create_account(cur, conn):
@@ -75,90 +93,117 @@ def create_account(cur, conn):
         conn: Database connection object for committing changes
         
     Returns:
-        int or None: User ID of the newly created user after successful login, or None on error
+        int or None: User ID of the newly created user, or None on error
     """
     print("New user, you will need to create an account")
     
-    # Validate unique username
+    # Validate unique username and email with a single query per attempt
     username = input("Enter your username: ")
-    try:
-        cur.execute("SELECT 1 FROM users WHERE username = %s", (username,))
-        exists = cur.fetchone() is not None
-    except (OperationalError, ProgrammingError) as e:
-        print(f"❌ Database error checking username: {e}")
-        print("Unable to create account. Please try again later.")
-        return None
-    
-    while exists:
-        print("Username already exists, please choose a different username")
-        username = input("Enter your username: ")
-        try:
-            cur.execute("SELECT 1 FROM users WHERE username = %s", (username,))
-            exists = cur.fetchone() is not None
-        except (OperationalError, ProgrammingError) as e:
-            print(f"❌ Database error checking username: {e}")
-            print("Unable to create account. Please try again later.")
-            return None
-    
-    # Validate unique email
     email = get_valid_email("Enter your email: ")
-    try:
-        cur.execute("SELECT 1 FROM users WHERE email = %s", (email,))
-        exists = cur.fetchone() is not None
-    except (OperationalError, ProgrammingError) as e:
-        print(f"❌ Database error checking email: {e}")
-        print("Unable to create account. Please try again later.")
-        return None
-    
-    while exists:
-        print("Email already exists, please choose a different email")
-        email = get_valid_email("Enter your email: ")
-        try:
-            cur.execute("SELECT 1 FROM users WHERE email = %s", (email,))
-            exists = cur.fetchone() is not None
-        except (OperationalError, ProgrammingError) as e:
-            print(f"❌ Database error checking email: {e}")
-            print("Unable to create account. Please try again later.")
+    while True:
+        username_exists = email_exists = None
+        with db_operation(conn, "check username and email"):
+            cur.execute(
+                """
+                SELECT EXISTS (SELECT 1 FROM users WHERE username = %s),
+                       EXISTS (SELECT 1 FROM users WHERE email = %s)
+                """,
+                (username, email)
+            )
+            username_exists, email_exists = cur.fetchone()
+        
+        if username_exists is None:
             return None
+        
+        if not username_exists and not email_exists:
+            break
+        
+        # Only re-prompt for the field(s) that conflict
+        if username_exists:
+            print("Username already exists, please choose a different username")
+            username = input("Enter your username: ")
+        if email_exists:
+            print("Email already exists, please choose a different email")
+            email = get_valid_email("Enter your email: ")
     
     # Hash password and create user
     plain_password = getpass("Enter your password: ").encode("utf-8")
-    hashed_password = bcrypt.hashpw(plain_password, bcrypt.gensalt()).decode("utf-8")
+    while not is_valid_password(plain_password):
+        print(f"Error: Password must be between 1 and {BCRYPT_MAX_PASSWORD_BYTES} bytes long")
+        plain_password = getpass("Enter your password: ").encode("utf-8")
+    hashed_password = bcrypt.hashpw(plain_password, bcrypt.gensalt(rounds=BCRYPT_COST))
     
-    try:
-        cur.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (username, email, hashed_password)
-        )
+    new_user_id = None
+    with db_operation(conn, "create account"):
+        try:
+            cur.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
+                (username, email, hashed_password)
+            )
+        except IntegrityError as e:
+            conn.rollback()
+            # This shouldn't happen since we validate uniqueness first
+            # But handle it anyway in case of race condition
+            constraint = e.diag.constraint_name
+            if constraint == "users_username_key":
+                print("❌ Error: Username already exists")
+            elif constraint == "users_email_key":
+                print("❌ Error: Email already exists")
+            else:
+                print("❌ Error: Username or email already exists")
+            print("Please try again with different credentials")
+            return None
+        
+        new_user_id = cur.fetchone()[0]
         conn.commit()
-        print("User created successfully, redirecting to login...")
-        return login_user(cur)
-        
-    except IntegrityError as e:
-        conn.rollback()
-        # This shouldn't happen since we validate uniqueness first
-        # But handle it anyway in case of race condition
-        print("❌ Error: Username or email already exists")
-        print("Please try again with different credentials")
-        return None
-        
-    except OperationalError as e:
-        conn.rollback()
-        print("❌ Database connection error")
-        print("Unable to create account. Please try again later.")
-        return None
-        
-    except DataError as e:
-        conn.rollback()
-        print(f"❌ Data error: {e}")
-        print("Please check your input values")
-        return None
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Unexpected error creating account")
-        print("Please try again")
-        return None
+        # The password was just set, so there's no need to log in again
+        print("User created successfully, heading to main menu...")
+    
+    return new_user_id
+
+
+def login_existing_user(cur, conn):
+    """
+    Handle the "Existing user" login menu choice.
+    
+    Args:
+        cur: Database cursor object
+        conn: Database connection object (unused, kept for the menu's common signature)
+        
+    Returns:
+        int: User ID of the logged-in user
+    """
+    print("Existing user, redirecting to login")
+    return login_user(cur)
+
+
+def exit_login_menu(cur, conn):
+    """
+    Handle the "Exit" login menu choice.
+    
+    Args:
+        cur: Database cursor object (unused)
+        conn: Database connection object (unused)
+        
+    Returns:
+        None: No user is logged in
+    """
+    print("Exiting Shoe Database...")
+    return None
+
+
+LOGIN_MENU = """Welcome to the Shoe Database
+Are you a new user or an existing user?
+1. New user
+2. Existing user
+3. Exit"""
+
+# Login menu choice -> handler taking (cur, conn) and returning a user ID or None
+LOGIN_MENU_ACTIONS = {
+    "1": create_account,
+    "2": login_existing_user,
+    "3": exit_login_menu,
+}
 
 
 def show_login_menu(cur, conn):
@@ -170,31 +215,28 @@ def show_login_menu(cur, conn):
         conn: Database connection object
         
     Returns:
-        int or None: User ID if successfully logged in, None if user chose to exit
+        tuple: (user_id, connection, cursor) where user_id is None if the user chose to exit.
+               The connection and cursor are the live ones, replaced if the original dropped.
     """
-    login_menu_active = True
-    current_user_id = None
-    
-    while login_menu_active:
-        print("Welcome to the Shoe Database")
-        print("Are you a new user or an existing user?")
-        print("1. New user")
-        print("2. Existing user")
-        print("3. Exit")
+    while True:
+        # Recover from a dropped connection instead of kicking the user out
+        if conn.closed:
+            conn, cur = reconnect_db(conn)
+        
+        print(LOGIN_MENU)
         
         choice = input("Enter your choice: ")
+        action = LOGIN_MENU_ACTIONS.get(choice)
         
-        if choice == "1":
-            current_user_id = create_account(cur, conn)
-            login_menu_active = False
-        elif choice == "2":
-            print("Existing user, redirecting to login")
-            current_user_id = login_user(cur)
-            login_menu_active = False
-        elif choice == "3":
-            print("Exiting Shoe Database...")
-            login_menu_active = False
-        else:
+        if action is None:
             print("\nError: Invalid choice, please try again\n")
-    
-    return current_user_id
+            continue
+        
+        current_user_id = action(cur, conn)
+        
+        # Login and signup stop early when the connection drops; reconnect and start over
+        if current_user_id is None and conn.closed:
+            print("Reconnecting to the database, please try again")
+            continue
+        
+        return current_user_id, conn, cur
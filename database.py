@@ -2,19 +2,110 @@
 Database connection module for the Shoe Database application.
 """
 
-import psycopg2
-from psycopg2 import OperationalError, DatabaseError   # Connection issues, server problems
+from psycopg2 import (
+    DatabaseError,      # Base class for all database errors
+    OperationalError,   # Connection issues, server problems
+    IntegrityError,     # Constraint violations (unique, foreign key)
+    DataError           # Invalid data (wrong type, out of range)
+)
+from psycopg2.pool import SimpleConnectionPool
+from contextlib import contextmanager
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Settings the application reads from the environment (or the .env file),
+# including BCRYPT_COST read by auth.py
+ENV_SETTINGS = ("DB_NAME", "DB_USER", "DB_PASS", "DB_HOST", "DB_PORT", "BCRYPT_COST")
+
+# Load environment variables from .env file, unless they're all already set
+# (e.g. exported by the shell or a test runner), which skips reading the file
+if not all(key in os.environ for key in ENV_SETTINGS):
+    load_dotenv()
+
+# Connection pool shared by the application, created on first use
+_pool = None
+
+
+def _get_pool():
+    """
+    Return the application's connection pool, creating it on first use.
+    
+    Returns:
+        SimpleConnectionPool: Pool holding between 1 and 4 database connections
+        
+    Raises:
+        OperationalError: If the initial connection cannot be established
+    """
+    global _pool
+    if _pool is None:
+        _pool = SimpleConnectionPool(
+            1, 4,
+            dbname=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASS"),
+            host=os.getenv("DB_HOST"),
+            port=os.getenv("DB_PORT")
+        )
+    return _pool
+
+
+def _rollback(conn):
+    """Roll back the current transaction, unless the connection has already been lost."""
+    if not conn.closed:
+        conn.rollback()
+
+
+@contextmanager
+def db_operation(conn, action):
+    """
+    Run a block of database work with the application's standard error handling.
+    On any error the transaction is rolled back, the user is told what went wrong,
+    and the error is swallowed so the calling menu can carry on.
+    
+    Code after the failing statement inside the block is skipped, so success
+    messages and result handling belong inside the block.
+    
+    Args:
+        conn: Database connection object to roll back on error
+        action: What the block does, used in error messages (e.g. "add shoe")
+    """
+    try:
+        yield
+        
+    except IntegrityError:
+        _rollback(conn)
+        # Constraint violation - maybe a database constraint we don't know about
+        print(f"❌ Database constraint error: Unable to {action}")
+        print("Please check your data and try again")
+        
+    except DataError as e:
+        _rollback(conn)
+        # Invalid data type or out of range
+        print(f"❌ Data error: {e}")
+        print("Please check your input values")
+        
+    except OperationalError:
+        _rollback(conn)
+        # Connection lost during operation
+        print("❌ Database connection error")
+        print(f"Unable to {action}. Please try again.")
+        
+    except DatabaseError:
+        _rollback(conn)
+        # Catch-all for other database errors
+        print("❌ Database error occurred")
+        print(f"Unable to {action}. Please try again.")
+        
+    except Exception as e:
+        _rollback(conn)
+        print(f"❌ Unexpected error: {e}")
 
 
 def initialize_schema(conn, cur):
     """
     Initialize the database schema by creating necessary tables and indexes.
     This function is idempotent - it can be run multiple times safely.
+    If the schema already exists, it returns after a single lookup instead of re-running the DDL.
     
     Args:
         conn: Database connection object
@@ -24,20 +115,46 @@ def initialize_schema(conn, cur):
         bool: True if schema initialization was successful, False otherwise
     """
     try:
-        # Create users table
+        # Skip the DDL (and the locks it takes) when the schema is already up to date
+        cur.execute("""
+            SELECT to_regclass('public.shoes') IS NOT NULL
+                AND EXISTS (
+                    SELECT 1 FROM pg_attribute
+                    WHERE attrelid = to_regclass('public.users')
+                        AND attname = 'password_hash'
+                        AND atttypid = 'bytea'::regtype
+                );
+        """)
+        if cur.fetchone()[0]:
+            conn.commit()
+            return True
+        
+        # All DDL goes out as one multi-statement query: a single round-trip
+        # instead of one per statement
         cur.execute("""
+            -- Create users table
             CREATE TABLE IF NOT EXISTS users (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
                 email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
+                password_hash BYTEA NOT NULL,
                 created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
                 last_login TIMESTAMPTZ
             );
-        """)
-        
-        # Create shoes table with foreign key cascade
-        cur.execute("""
+            
+            -- Migrate password hashes stored as TEXT by older versions to BYTEA
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = 'public'
+                        AND table_name = 'users'
+                        AND column_name = 'password_hash') = 'text' THEN
+                    ALTER TABLE users
+                    ALTER COLUMN password_hash TYPE BYTEA USING convert_to(password_hash, 'UTF8');
+                END IF;
+            END $$;
+            
+            -- Create shoes table with foreign key cascade
             CREATE TABLE IF NOT EXISTS shoes (
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
@@ -49,11 +166,9 @@ def initialize_schema(conn, cur):
                 image TEXT,
                 condition TEXT NOT NULL
             );
-        """)
-        
-        # Create index for better query performance
-        # Use CREATE INDEX IF NOT EXISTS (PostgreSQL 9.5+)
-        cur.execute("""
+            
+            -- Create index for better query performance
+            -- Use CREATE INDEX IF NOT EXISTS (PostgreSQL 9.5+)
             CREATE INDEX IF NOT EXISTS shoes_user_brand_model_idx
             ON shoes (user_id, brand, model);
         """)
@@ -76,7 +191,7 @@ def initialize_schema(conn, cur):
 
 def get_db_connection():
     """
-    Establish and return a connection to the PostgreSQL database.
+    Get a connection to the PostgreSQL database from the connection pool.
     Automatically initializes the database schema if tables don't exist.
     
     Returns:
@@ -86,13 +201,7 @@ def get_db_connection():
         SystemExit: If connection fails (exits the program)
     """
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASS"),
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT")
-        )
+        conn = _get_pool().getconn()
         cur = conn.cursor()
         
         # Initialize schema (create tables and indexes if they don't exist)
@@ -116,9 +225,35 @@ def get_db_connection():
         exit(1)
 
 
+def reconnect_db(conn):
+    """
+    Replace a broken connection with a fresh one from the pool.
+    Used after a dropped connection so the user isn't kicked out of the application.
+    
+    Args:
+        conn: The broken database connection object
+        
+    Returns:
+        tuple: (connection, cursor) objects for database operations
+        
+    Raises:
+        SystemExit: If the database can't be reached again (exits the program)
+    """
+    pool = _get_pool()
+    pool.putconn(conn, close=True)
+    
+    try:
+        conn = pool.getconn()
+        return conn, conn.cursor()
+    except OperationalError as e:
+        print(f"❌ Cannot reconnect to database: {e}")
+        exit(1)  # Exit because app can't function without DB
+
+
 def close_db_connection(conn, cur):
     """
     Safely close database connection and cursor.
+    Closes every connection held by the pool, since the application is exiting.
     
     Args:
         conn: Database connection object
@@ -126,6 +261,6 @@ def close_db_connection(conn, cur):
     """
     if cur:
         cur.close()
-    if conn:
-        conn.close()
+    if _pool is not None:
+        _pool.closeall()
     print("Database connection closed successfully.")
@@ -7,11 +7,23 @@ CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     username VARCHAR(50) UNIQUE NOT NULL,
     email VARCHAR(255) UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL,
+    password_hash BYTEA NOT NULL,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     last_login TIMESTAMPTZ
 );
 
+-- Migrate password hashes stored as TEXT by older versions to BYTEA
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'public'
+            AND table_name = 'users'
+            AND column_name = 'password_hash') = 'text' THEN
+        ALTER TABLE users
+        ALTER COLUMN password_hash TYPE BYTEA USING convert_to(password_hash, 'UTF8');
+    END IF;
+END $$;
+
 -- Create shoes table for inventory management
 CREATE TABLE IF NOT EXISTS shoes (
     id SERIAL PRIMARY KEY,
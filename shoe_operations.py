@@ -3,14 +3,41 @@ Shoe operations module for the Shoe Database application.
 Handles CRUD operations for shoes in the inventory.
 """
 
+import sys
+import weakref
+from collections import defaultdict
 from validation import get_valid_float, get_valid_string
-from psycopg2 import (
-    DatabaseError,      # Base class for all database errors
-    OperationalError,   # Connection issues, server problems
-    IntegrityError,     # Constraint violations (unique, foreign key)
-    DataError,          # Invalid data (wrong type, out of range)
-    ProgrammingError    # SQL syntax errors, wrong table names
-)
+from database import db_operation, reconnect_db
+
+
+def _sort_by_quantity(groups, limit):
+    """
+    Order drill-down groups the way the menus list them: most pairs first, then by name.
+    
+    Args:
+        groups: Dict mapping a group key to its list of shoe rows (or nested groups)
+        limit: Maximum number of groups to return
+        
+    Returns:
+        list: (key, quantity) tuples
+    """
+    counts = [(key, _count_shoes(value)) for key, value in groups.items()]
+    counts.sort(key=lambda item: (-item[1], item[0]))
+    return counts[:limit]
+
+
+def _count_shoes(group):
+    """Count the shoe rows under a drill-down group (a row list or nested dict)."""
+    if isinstance(group, list):
+        return len(group)
+    return sum(_count_shoes(child) for child in group.values())
+
+
+def _quantity_listing(results):
+    """Format (name, quantity) pairs the way the drill-down menus list them."""
+    return "\n".join(
+        f"{name}, {qty} {'Pair' if qty == 1 else 'Pairs'} of Shoes" for name, qty in results
+    )
 
 
 def select_shoe_from_inventory(cur, current_user_id):
@@ -18,6 +45,9 @@ def select_shoe_from_inventory(cur, current_user_id):
     Guide user through selecting a specific shoe from their inventory.
     Uses a drill-down approach: Brand → Model → Variant → Specific Shoe
     
+    The user's shoes are fetched in a single query and the drill-down is
+    done in memory, so each step doesn't cost another database round-trip.
+    
     Args:
         cur: Database cursor object
         current_user_id: The ID of the current logged-in user
@@ -26,136 +56,92 @@ def select_shoe_from_inventory(cur, current_user_id):
         tuple: (shoe_id, brand, model, colorway, size, price, image, condition) 
                or None if no shoes found or selection cancelled
     """
-    # Step 1: Get all brands
-    try:
+    # Step 1: Get all of the user's shoes and group them brand → model → variant
+    shoe_rows = None
+    with db_operation(cur.connection, "retrieve shoes"):
         cur.execute("""
-            SELECT brand, COUNT(*) AS quantity
+            SELECT id, brand, model, colorway, size, price, image, condition
             FROM shoes
             WHERE user_id = %s
-            GROUP BY brand
-            ORDER BY quantity DESC, brand ASC
-            LIMIT 20;
+            ORDER BY id ASC;
         """, (current_user_id,))
         
-        brand_results = cur.fetchall()
-    except (OperationalError, ProgrammingError) as e:
-        print(f"❌ Database error fetching brands: {e}")
-        print("Unable to retrieve shoes. Please try again.")
-        return None
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        shoe_rows = cur.fetchall()
+    
+    if shoe_rows is None:
         return None
     
-    if not brand_results:
+    if not shoe_rows:
         print("No shoes found in the database")
         return None
     
+    # Brand/model/colorway/condition strings repeat heavily across rows,
+    # so intern them to keep a single copy of each while the inventory is held
+    inventory = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    for shoe_id, brand, model, colorway, size, price, image, condition in shoe_rows:
+        brand, model = sys.intern(brand), sys.intern(model)
+        colorway, condition = sys.intern(colorway), sys.intern(condition)
+        row = (shoe_id, brand, model, colorway, size, price, image, condition)
+        inventory[brand][model][(colorway, size, condition)].append(row)
+    
+    # The listings don't change between retries, so each one is built once
+    brand_lines = _quantity_listing(_sort_by_quantity(inventory, 20))
+    
     # Step 2: Select a brand
     valid_selection = False
     while not valid_selection:
         print("\nHere are the brands of your shoes:")
-        for brand, qty in brand_results:
-            pair_word = "Pair" if qty == 1 else "Pairs"
-            print(f"{brand}, {qty} {pair_word} of Shoes")
+        print(brand_lines)
         
         brand_choice = input("\nSelect a brand: ")
         
-        try:
-            cur.execute("""
-                SELECT model, COUNT(*) AS quantity
-                FROM shoes
-                WHERE user_id = %s AND brand = %s
-                GROUP BY model
-                ORDER BY quantity DESC, model ASC
-                LIMIT 20;
-            """, (current_user_id, brand_choice))
-            
-            model_results = cur.fetchall()
-        except (OperationalError, ProgrammingError) as e:
-            print(f"❌ Database error: {e}")
-            print("Please try again.")
-            continue
-        
-        if not model_results:
+        if brand_choice not in inventory:
             print("\nError: Please select a valid brand")
         else:
             valid_selection = True
     
+    models = inventory[brand_choice]
+    model_lines = _quantity_listing(_sort_by_quantity(models, 20))
+    
     # Step 3: Select a model
     valid_selection = False
     while not valid_selection:
         print("\nHere are the models of your shoes:")
-        for model, qty in model_results:
-            pair_word = "Pair" if qty == 1 else "Pairs"
-            print(f"{model}, {qty} {pair_word} of Shoes")
+        print(model_lines)
         
         model_choice = input("\nSelect a model: ")
         
-        try:
-            cur.execute("""
-                SELECT colorway, size, condition, COUNT(*) AS quantity
-                FROM shoes
-                WHERE user_id = %s
-                    AND brand = %s
-                    AND model = %s
-                GROUP BY colorway, size, condition
-                ORDER BY quantity DESC, colorway ASC, size ASC, condition ASC
-                LIMIT 50;
-            """, (current_user_id, brand_choice, model_choice))
-            
-            variant_results = cur.fetchall()
-        except (OperationalError, ProgrammingError) as e:
-            print(f"❌ Database error: {e}")
-            print("Please try again.")
-            continue
-        
-        if not variant_results:
+        if model_choice not in models:
             print("\nError: Please select a valid model")
         else:
             valid_selection = True
     
+    variants = models[model_choice]
+    variant_results = [
+        (colorway, size, condition, qty)
+        for (colorway, size, condition), qty in _sort_by_quantity(variants, 50)
+    ]
+    
     # Step 4: Select a variant (colorway + size + condition)
+    variant_lines = "\n".join(
+        f"{i}. {model_choice}, {colorway}, {size}, {condition}, {qty} {'Pair' if qty == 1 else 'Pairs'} of Shoes"
+        for i, (colorway, size, condition, qty) in enumerate(variant_results, 1)
+    )
     valid_selection = False
     while not valid_selection:
-        i = 0
         print("\nHere are the variants of your shoes:")
-        for colorway, size, condition, qty in variant_results:
-            i += 1
-            pair_word = "Pair" if qty == 1 else "Pairs"
-            print(f"{i}. {model_choice}, {colorway}, {size}, {condition}, {qty} {pair_word} of Shoes")
+        print(variant_lines)
         
         variant_choice = input("\nSelect a variant: ")
-        if variant_choice.isdigit() and int(variant_choice) > 0 and int(variant_choice) <= i:
+        variant_number = int(variant_choice) if variant_choice.isdecimal() else 0
+        if 1 <= variant_number <= len(variant_results):
             valid_selection = True
         else:
             print("\nError: Please select a valid variant")
     
-    # Step 5: Get the specific shoe record
-    colorway_choice, size_choice, condition_choice, qty = variant_results[int(variant_choice) - 1]
-    
-    try:
-        cur.execute("""
-            SELECT id, brand, model, colorway, size, price, image, condition
-            FROM shoes
-            WHERE user_id = %s
-                AND brand = %s
-                AND model = %s
-                AND colorway = %s
-                AND size = %s
-                AND condition = %s
-            ORDER BY id ASC
-            LIMIT 1;
-        """, (current_user_id, brand_choice, model_choice, colorway_choice, size_choice, condition_choice))
-        
-        shoe_result = cur.fetchone()
-    except (OperationalError, ProgrammingError) as e:
-        print(f"❌ Database error fetching shoe details: {e}")
-        print("Unable to retrieve shoe. Please try again.")
-        return None
-    
-    if shoe_result is None:
-        print("No shoe found with the given criteria")
-        return None
+    # Step 5: Get the specific shoe record (the oldest one of the chosen variant)
+    colorway_choice, size_choice, condition_choice, qty = variant_results[variant_number - 1]
+    shoe_result = variants[(colorway_choice, size_choice, condition_choice)][0]
     
     # Unpack and display the shoe details
     shoe_id, brand, model, colorway, size, price, image, condition = shoe_result
@@ -195,7 +181,7 @@ def add_shoe(cur, conn, current_user_id):
     # Validate condition input
     condition = get_valid_string("Enter the condition of your shoe(New, Used, Damaged, etc.): ", min_length=1, max_length=50)
     
-    try:
+    with db_operation(conn, "add shoe"):
         cur.execute(
             """
             INSERT INTO shoes (user_id, brand, model, colorway, size, price, image, condition)
@@ -205,47 +191,20 @@ def add_shoe(cur, conn, current_user_id):
         )
         conn.commit()
         print("Shoe added to your collection!")
-        
-    except IntegrityError as e:
-        conn.rollback()
-        # Constraint violation - maybe a database constraint we don't know about
-        print(f"❌ Database constraint error: Unable to add shoe")
-        print("Please check your data and try again")
-        
-    except DataError as e:
-        conn.rollback()
-        # Invalid data type or out of range
-        print(f"❌ Data error: {e}")
-        print("Please check your input values")
-        
-    except OperationalError as e:
-        conn.rollback()
-        # Connection lost during operation
-        print(f"❌ Database connection error")
-        print("Please try again")
-        
-    except DatabaseError as e:
-        conn.rollback()
-        # Catch-all for other database errors
-        print(f"❌ Database error occurred")
-        print("The shoe was not added")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Unexpected error: {e}")
 
 
-def view_all_shoes(cur, current_user_id):
+def view_all_shoes(cur, conn, current_user_id):
     """
     Display all shoes in the user's collection grouped by brand and model.
     
     Args:
         cur: Database cursor object
+        conn: Database connection object to roll back on error
         current_user_id: The ID of the current logged-in user
     """
     print("Grabbing all of your shoes from the database...")
     
-    try:
+    with db_operation(conn, "retrieve shoes"):
         cur.execute(
             """
             SELECT brand, model, COUNT(*) AS quantity
@@ -256,23 +215,59 @@ def view_all_shoes(cur, current_user_id):
             """,
             (current_user_id,)
         )
-        shoes = cur.fetchall()
-        
-        print("\n brand | model | quantity\n")
-        for shoe in shoes:
-            print(shoe)
-        print("\n")
         
-    except OperationalError as e:
-        print(f"❌ Database connection error")
-        print("Unable to retrieve shoes. Please try again.")
-        
-    except ProgrammingError as e:
-        print(f"❌ Query error")
-        print("Unable to retrieve shoes")
-        
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        # Build the whole listing and write it out at once instead of one print per row
+        rows = "\n".join(f"{brand} | {model} | {quantity}" for brand, model, quantity in cur)
+        sys.stdout.write(f"\n brand | model | quantity\n\n{rows}\n\n\n")
+
+
+# Editable shoe fields by menu choice:
+# (column, SQL type, label, input function, prompt, input options)
+EDITABLE_FIELDS = {
+    "1": ("brand", "text", "Brand", get_valid_string, "Enter the new brand name: ",
+          {"min_length": 1, "max_length": 100}),
+    "2": ("model", "text", "Model", get_valid_string, "Enter the new model name: ",
+          {"min_length": 1, "max_length": 100}),
+    "3": ("colorway", "text", "Colorway", get_valid_string, "Enter the new colorway: ",
+          {"min_length": 1, "max_length": 100}),
+    "4": ("size", "double precision", "Size", get_valid_float, "Enter the new size: ",
+          {"min_value": 1.0, "max_value": 20.0}),
+    "5": ("price", "double precision", "Price", get_valid_float, "Enter the new price: ",
+          {"min_value": 0.01, "max_value": 100000.0}),
+    "6": ("image", "text", "Image location", get_valid_string, "Enter the new image filename: ",
+          {"allow_empty": True}),
+    "7": ("condition", "text", "Condition", get_valid_string,
+          "Enter the updated condition(New, Used, Damaged, etc.): ",
+          {"min_length": 1, "max_length": 50}),
+}
+
+# Prepared UPDATE statement names per connection object. Entries disappear with
+# their connection, so a reconnect always starts with nothing prepared
+_prepared_updates = weakref.WeakKeyDictionary()
+
+
+def _execute_shoe_update(cur, conn, column, sql_type, value, shoe_id):
+    """
+    Update one column of a shoe through a server-side prepared statement.
+    The statement is prepared the first time a column is edited in a session,
+    so later edits reuse the cached plan instead of re-parsing the UPDATE.
+    
+    Args:
+        cur: Database cursor object
+        conn: Database connection object the statement is prepared on
+        column: Column to update (taken from EDITABLE_FIELDS, never user input)
+        sql_type: SQL type of the column
+        value: New value for the column
+        shoe_id: ID of the shoe to update
+    """
+    statement = f"update_shoe_{column}"
+    prepared = _prepared_updates.setdefault(conn, set())
+    
+    if statement not in prepared:
+        cur.execute(f"PREPARE {statement} ({sql_type}, integer) AS UPDATE shoes SET {column} = $1 WHERE id = $2")
+        prepared.add(statement)
+    
+    cur.execute(f"EXECUTE {statement} (%s, %s)", (value, shoe_id))
 
 
 def edit_shoe(cur, conn, shoe_data):
@@ -293,77 +288,26 @@ def edit_shoe(cur, conn, shoe_data):
         print("1. Brand\n2. Model\n3. Colorway\n4. Size\n5. Price\n6. Image\n7. Condition\n\n")
         edit_choice = input("Enter your choice: ")
         
-        try:
-            if edit_choice == "1":
-                new_brand = get_valid_string("Enter the new brand name: ", min_length=1, max_length=100)
-                cur.execute("UPDATE shoes SET brand = %s WHERE id = %s", (new_brand, shoe_id))
-                conn.commit()
-                print(f"Brand updated successfully to be '{new_brand}'")
-                valid_selection = True
-            elif edit_choice == "2":
-                new_model = get_valid_string("Enter the new model name: ", min_length=1, max_length=100)
-                cur.execute("UPDATE shoes SET model = %s WHERE id = %s", (new_model, shoe_id))
-                conn.commit()
-                print(f"Model updated successfully to be '{new_model}'")
-                valid_selection = True
-            elif edit_choice == "3":
-                new_colorway = get_valid_string("Enter the new colorway: ", min_length=1, max_length=100)
-                cur.execute("UPDATE shoes SET colorway = %s WHERE id = %s", (new_colorway, shoe_id))
-                conn.commit()
-                print(f"Colorway updated successfully to be '{new_colorway}'")
-                valid_selection = True
-            elif edit_choice == "4":
-                new_size = get_valid_float("Enter the new size: ", min_value=1.0, max_value=20.0)
-                cur.execute("UPDATE shoes SET size = %s WHERE id = %s", (new_size, shoe_id))
-                conn.commit()
-                print(f"Size updated successfully to be '{new_size}'")
-                valid_selection = True
-            elif edit_choice == "5":
-                new_price = get_valid_float("Enter the new price: ", min_value=0.01, max_value=100000.0)
-                cur.execute("UPDATE shoes SET price = %s WHERE id = %s", (new_price, shoe_id))
-                conn.commit()
-                print(f"Price updated successfully to be '{new_price}'")
-                valid_selection = True
-            elif edit_choice == "6":
-                new_image = get_valid_string("Enter the new image filename: ", allow_empty=True)
-                cur.execute("UPDATE shoes SET image = %s WHERE id = %s", (new_image or None, shoe_id))
-                conn.commit()
-                print(f"Image location updated successfully to be '{new_image}'")
-                valid_selection = True
-            elif edit_choice == "7":
-                new_condition = get_valid_string("Enter the updated condition(New, Used, Damaged, etc.): ", min_length=1, max_length=50)
-                cur.execute("UPDATE shoes SET condition = %s WHERE id = %s", (new_condition, shoe_id))
-                conn.commit()
-                print(f"Condition updated successfully to be '{new_condition}'")
-                valid_selection = True
-            else:
-                print("\nError: Invalid choice, please try again")
-                print(f"\nShoe Details: {brand}, {model}, {colorway}, {size}, ${price}, {image}, {condition}")
-                print("\n")
-                
-        except IntegrityError as e:
-            conn.rollback()
-            print(f"❌ Database constraint error: Unable to update shoe")
-            print("Please try again")
-            
-        except DataError as e:
-            conn.rollback()
-            print(f"❌ Data error: {e}")
-            print("Please check your input values")
-            
-        except OperationalError as e:
-            conn.rollback()
-            print(f"❌ Database connection error")
-            print("Please try again")
-            
-        except DatabaseError as e:
-            conn.rollback()
-            print(f"❌ Database error occurred")
-            print("The shoe was not updated")
-            
-        except Exception as e:
-            conn.rollback()
-            print(f"❌ Unexpected error: {e}")
+        field = EDITABLE_FIELDS.get(edit_choice)
+        if field is None:
+            print("\nError: Invalid choice, please try again")
+            print(f"\nShoe Details: {brand}, {model}, {colorway}, {size}, ${price}, {image}, {condition}")
+            print("\n")
+            continue
+        
+        column, sql_type, label, get_value, prompt, options = field
+        new_value = get_value(prompt, **options)
+        
+        with db_operation(conn, "update shoe"):
+            # Empty optional values (the image) are stored as NULL
+            _execute_shoe_update(cur, conn, column, sql_type, new_value or None, shoe_id)
+            conn.commit()
+            print(f"{label} updated successfully to be '{new_value}'")
+            valid_selection = True
+        
+        # Retrying on a dead connection can't succeed; let the shoe menu reconnect
+        if conn.closed:
+            return
 
 
 def delete_shoe(cur, conn, shoe_data):
@@ -379,29 +323,90 @@ def delete_shoe(cur, conn, shoe_data):
     
     print("Deleting the shoe...")
     
-    try:
+    with db_operation(conn, "delete shoe"):
         cur.execute("DELETE FROM shoes WHERE id = %s", (shoe_id,))
         conn.commit()
         print(f"{brand} {model} was deleted successfully")
+
+
+def view_selected_shoe(cur, conn, current_user_id):
+    """
+    Let the user pick a shoe from their inventory and show its details.
+    
+    Args:
+        cur: Database cursor object
+        conn: Database connection object (unused, kept for the menu's common signature)
+        current_user_id: The ID of the current logged-in user
+    """
+    select_shoe_from_inventory(cur, current_user_id)
+
+
+def edit_selected_shoe(cur, conn, current_user_id):
+    """
+    Let the user pick a shoe from their inventory and edit it.
+    
+    Args:
+        cur: Database cursor object
+        conn: Database connection object for committing changes
+        current_user_id: The ID of the current logged-in user
+    """
+    shoe_data = select_shoe_from_inventory(cur, current_user_id)
+    if shoe_data is not None:
+        edit_shoe(cur, conn, shoe_data)
+
+
+def delete_selected_shoe(cur, conn, current_user_id):
+    """
+    Let the user pick a shoe from their inventory and delete it.
+    
+    Args:
+        cur: Database cursor object
+        conn: Database connection object for committing changes
+        current_user_id: The ID of the current logged-in user
+    """
+    shoe_data = select_shoe_from_inventory(cur, current_user_id)
+    if shoe_data is not None:
+        delete_shoe(cur, conn, shoe_data)
+
+
+# Returned by a shoe menu handler to leave the menu
+EXIT_SHOE_MENU = object()
+
+
+def exit_shoe_menu(cur, conn, current_user_id):
+    """
+    Handle the "Exit" shoe menu choice.
+    
+    Args:
+        cur: Database cursor object (unused)
+        conn: Database connection object (unused)
+        current_user_id: The ID of the current logged-in user (unused)
         
-    except IntegrityError as e:
-        conn.rollback()
-        print(f"❌ Database constraint error: Unable to delete shoe")
-        print("Please try again")
-        
-    except OperationalError as e:
-        conn.rollback()
-        print(f"❌ Database connection error")
-        print("Please try again")
-        
-    except DatabaseError as e:
-        conn.rollback()
-        print(f"❌ Database error occurred")
-        print("The shoe was not deleted")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Unexpected error: {e}")
+    Returns:
+        object: EXIT_SHOE_MENU, telling the shoe menu to stop
+    """
+    print("Exiting Shoe Menu...")
+    return EXIT_SHOE_MENU
+
+
+SHOE_MENU = """Welcome to the Shoe Menu
+1. Add a shoe
+2. View all shoes
+3. View a specific shoe
+4. Edit a shoe
+5. Delete a shoe
+6. Exit"""
+
+# Shoe menu choice -> handler taking (cur, conn, current_user_id);
+# returning EXIT_SHOE_MENU leaves the menu
+SHOE_MENU_ACTIONS = {
+    "1": add_shoe,
+    "2": view_all_shoes,
+    "3": view_selected_shoe,
+    "4": edit_selected_shoe,
+    "5": delete_selected_shoe,
+    "6": exit_shoe_menu,
+}
 
 
 def show_shoe_menu(cur, conn, current_user_id):
@@ -412,44 +417,23 @@ def show_shoe_menu(cur, conn, current_user_id):
         cur: Database cursor object
         conn: Database connection object
         current_user_id: The ID of the current logged-in user
+        
+    Returns:
+        tuple: (connection, cursor) that are live when the menu exits,
+               replaced if the original connection dropped
     """
-    shoe_menu_active = True
-    
-    while shoe_menu_active:
-        print("Welcome to the Shoe Menu")
-        print("1. Add a shoe")
-        print("2. View all shoes")
-        print("3. View a specific shoe")
-        print("4. Edit a shoe")
-        print("5. Delete a shoe")
-        print("6. Exit")
+    while True:
+        # Recover from a dropped connection instead of failing every later action
+        if conn.closed:
+            conn, cur = reconnect_db(conn)
+        
+        print(SHOE_MENU)
         choice = input("Enter your choice: ")
+        action = SHOE_MENU_ACTIONS.get(choice)
         
-        if choice == "1":
-            add_shoe(cur, conn, current_user_id)
-            
-        elif choice == "2":
-            view_all_shoes(cur, current_user_id)
-            
-        elif choice == "3":
-            shoe_data = select_shoe_from_inventory(cur, current_user_id)
-            if shoe_data is None:
-                continue
-                
-        elif choice == "4":
-            shoe_data = select_shoe_from_inventory(cur, current_user_id)
-            if shoe_data is None:
-                continue
-            edit_shoe(cur, conn, shoe_data)
-            
-        elif choice == "5":
-            shoe_data = select_shoe_from_inventory(cur, current_user_id)
-            if shoe_data is None:
-                continue
-            delete_shoe(cur, conn, shoe_data)
-            
-        elif choice == "6":
-            print("Exiting Shoe Menu...")
-            shoe_menu_active = False
-        else:
+        if action is None:
             print("\nError: Invalid choice, please try again\n")
+            continue
+        
+        if action(cur, conn, current_user_id) is EXIT_SHOE_MENU:
+            return conn, cur
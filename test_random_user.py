@@ -1,23 +1,10 @@
-import psycopg2
+from psycopg2.extras import execute_values
 import bcrypt
-import os
 import random
+import sys
+from collections import Counter
 from getpass import getpass
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Connect to database
-conn = psycopg2.connect(
-    dbname=os.getenv("DB_NAME"),
-    user=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASS"),
-    host=os.getenv("DB_HOST"),
-    port=os.getenv("DB_PORT")
-)
-
-cur = conn.cursor()
+from database import get_db_connection, close_db_connection
 
 # Shoe database - 30+ shoes per brand
 SHOE_DATABASE = {
@@ -191,169 +178,208 @@ SHOE_DATABASE = {
 CONDITIONS = ["New", "Like New", "Used"]
 SIZES = [7.0, 7.5, 8.0, 8.5, 9.0, 9.5, 10.0, 10.5, 11.0, 11.5, 12.0, 12.5, 13.0]
 
-def generate_shoe_data(brand, model, colorway):
-    """Generate complete shoe data with random attributes"""
-    size = random.choice(SIZES)
-    condition = random.choice(CONDITIONS)
-    
-    # Generate price based on brand (rough estimates)
-    base_prices = {
-        "Nike": (80, 250),
-        "Jordan": (150, 350),
-        "Adidas": (70, 400),
-        "Puma": (60, 180),
-        "Under Armour": (70, 200)
-    }
-    
-    min_price, max_price = base_prices.get(brand, (70, 200))
-    price = round(random.uniform(min_price, max_price), 2)
+# bcrypt work factor for the test user's password. Lower than the app's cost since
+# this is throwaway test data; the app reads the cost from the stored hash, so the
+# user can still log in normally. Production accounts keep the higher cost.
+TEST_BCRYPT_COST = 10
+
+# Price range per brand (rough estimates)
+BASE_PRICES = {
+    "Nike": (80, 250),
+    "Jordan": (150, 350),
+    "Adidas": (70, 400),
+    "Puma": (60, 180),
+    "Under Armour": (70, 200)
+}
+
+# Lookup tables built once so the pick loop doesn't rebuild them per shoe
+BRANDS = tuple(SHOE_DATABASE)
+MODELS_BY_BRAND = {brand: tuple(models) for brand, models in SHOE_DATABASE.items()}
+
+def _slugify(name):
+    """Lowercase a name and swap slashes/spaces for underscores, for use in image filenames"""
+    return name.lower().replace('/', '_').replace(' ', '_')
+
+# Image filename for every (brand, model, colorway), so no string work happens per shoe
+IMAGE_NAMES = {
+    (brand, model, colorway): f"{_slugify(brand)}_{_slugify(model)}_{_slugify(colorway)}.jpg"
+    for brand, models in SHOE_DATABASE.items()
+    for model, colorways in models
+    for colorway in colorways
+}
+
+def generate_shoe_data(brand, model, colorway, size, condition):
+    """Generate complete shoe data with a random price for the given attributes"""
+    # Generate price based on brand
+    min_price, max_price = BASE_PRICES.get(brand, (70, 200))
+    price = round(min_price + random.random() * (max_price - min_price), 2)
     
-    # Generate image filename
-    image_name = f"{brand.lower().replace(' ', '_')}_{model.lower().replace(' ', '_')}_{colorway.lower().replace('/', '_').replace(' ', '_')}.jpg"
+    # Look up the precomputed image filename
+    image_name = IMAGE_NAMES[(brand, model, colorway)]
     
     return (brand, model, colorway, size, price, image_name, condition)
 
 def pick_random_shoes(num_shoes=20, num_duplicates=2):
     """Pick random shoes ensuring at least num_duplicates sets of duplicates"""
-    all_shoes = []
+    # Each duplicate set is generated once and added twice
+    num_generated = num_shoes - num_duplicates
     
-    # First, ensure we have at least num_duplicates sets of duplicates
-    duplicate_shoes = []
-    for _ in range(num_duplicates):
-        brand = random.choice(list(SHOE_DATABASE.keys()))
-        model, colorways = random.choice(SHOE_DATABASE[brand])
-        colorway = random.choice(colorways)
-        shoe_data = generate_shoe_data(brand, model, colorway)
-        # Add this shoe twice
-        duplicate_shoes.append(shoe_data)
-        duplicate_shoes.append(shoe_data)
+    # Draw brands, sizes and conditions for every shoe in one batch each
+    brands = random.choices(BRANDS, k=num_generated)
+    sizes = random.choices(SIZES, k=num_generated)
+    conditions = random.choices(CONDITIONS, k=num_generated)
     
-    # Now fill the rest with random unique shoes
-    remaining_slots = num_shoes - (num_duplicates * 2)
+    generated = []
+    for brand, size, condition in zip(brands, sizes, conditions):
+        model, colorways = random.choice(MODELS_BY_BRAND[brand])
+        generated.append(generate_shoe_data(brand, model, random.choice(colorways), size, condition))
     
-    for _ in range(remaining_slots):
-        brand = random.choice(list(SHOE_DATABASE.keys()))
-        model, colorways = random.choice(SHOE_DATABASE[brand])
-        colorway = random.choice(colorways)
-        shoe_data = generate_shoe_data(brand, model, colorway)
-        all_shoes.append(shoe_data)
+    # The first num_duplicates shoes are the duplicate sets; put each in two random slots
+    all_shoes = [None] * num_shoes
+    duplicate_positions = random.sample(range(num_shoes), 2 * num_duplicates)
+    for shoe_data, first, second in zip(generated, duplicate_positions[::2], duplicate_positions[1::2]):
+        all_shoes[first] = all_shoes[second] = shoe_data
     
-    # Combine and shuffle
-    all_shoes.extend(duplicate_shoes)
-    random.shuffle(all_shoes)
+    # Fill the remaining slots in order; the shoes are already random, so no shuffle is needed
+    remaining = iter(generated[num_duplicates:])
+    return [shoe if shoe is not None else next(remaining) for shoe in all_shoes]
+
+def main():
+    """Create a fresh test user and fill their collection with random shoes."""
+    # Get a pooled database connection (also makes sure the schema exists)
+    conn, cur = get_db_connection()
+    try:
+        run_generator(cur, conn)
+    finally:
+        close_db_connection(conn, cur)
+
+
+def run_generator(cur, conn):
+    """
+    Prompt for test credentials, recreate the user and add their random shoes.
     
-    return all_shoes
-
-# ==========================
-# USER INPUT
-# ==========================
-print("=" * 60)
-print("SHOE DATABASE - Random Collection Generator")
-print("=" * 60)
-
-username = input("\nEnter username for new test user: ").strip()
-password = getpass("Enter password for new test user: ").strip()
-
-if not username or not password:
-    print("Error: Username and password cannot be empty!")
-    cur.close()
-    conn.close()
-    exit(1)
-
-print("\n" + "=" * 60)
-print(f"Creating User: '{username}'")
-print("=" * 60)
-
-# Step 1: Clean up - Delete user if exists (and cascade delete shoes)
-print("\n[1] Cleaning up existing test data...")
-cur.execute("DELETE FROM shoes WHERE user_id IN (SELECT id FROM users WHERE username = %s)", (username,))
-cur.execute("DELETE FROM users WHERE username = %s", (username,))
-conn.commit()
-print("[OK] Cleanup complete")
-
-# Step 2: Create user with provided credentials
-print(f"\n[2] Creating user '{username}'...")
-email = f"{username}@test.com"
-plain_password = password.encode("utf-8")
-hashed_password = bcrypt.hashpw(plain_password, bcrypt.gensalt()).decode("utf-8")
-
-cur.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id", 
-            (username, email, hashed_password))
-user_id = cur.fetchone()[0]
-conn.commit()
-print(f"[OK] User created with ID: {user_id}")
-
-# Step 3: Generate and add random shoes
-print("\n[3] Generating 20 random shoes with at least 2 sets of duplicates...")
-shoes_data = pick_random_shoes(num_shoes=20, num_duplicates=2)
-
-print("[3] Adding shoes to collection...")
-for i, shoe in enumerate(shoes_data, 1):
-    brand, model, colorway, size, price, image, condition = shoe
-    cur.execute(
-        """
-        INSERT INTO shoes (user_id, brand, model, colorway, size, price, image, condition)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """,
-        (user_id, brand, model, colorway, size, price, image, condition)
-    )
-    print(f"  [{i}/20] Added: {brand} {model} - {colorway} (Size {size}, ${price}, {condition})")
-
-conn.commit()
-print("[OK] All 20 shoes added successfully")
-
-# Step 4: Display summary statistics
-print("\n[4] Collection Summary:")
-print("-" * 60)
-
-cur.execute("""
-    SELECT brand, COUNT(*) as count
-    FROM shoes
-    WHERE user_id = %s
-    GROUP BY brand
-    ORDER BY count DESC
-""", (user_id,))
-
-brand_summary = cur.fetchall()
-print("\nShoes by Brand:")
-for brand, count in brand_summary:
-    print(f"  • {brand}: {count} pairs")
-
-cur.execute("""
-    SELECT brand, model, COUNT(*) as count
-    FROM shoes
-    WHERE user_id = %s
-    GROUP BY brand, model
-    ORDER BY count DESC, brand, model
-""", (user_id,))
-
-model_summary = cur.fetchall()
-print("\nShoes by Model (showing duplicates):")
-for brand, model, count in model_summary:
-    if count > 1:
-        print(f"  • {brand} {model}: {count} pairs [DUPLICATE]")
-    else:
-        print(f"  • {brand} {model}: {count} pair")
-
-cur.execute("""
-    SELECT brand, model, colorway, size, price, condition
-    FROM shoes
-    WHERE user_id = %s
-    ORDER BY brand, model, colorway
-""", (user_id,))
-
-all_shoes = cur.fetchall()
-print("\nComplete Inventory:")
-print("-" * 60)
-for i, shoe in enumerate(all_shoes, 1):
-    brand, model, colorway, size, price, condition = shoe
-    print(f"{i:2d}. {brand:12s} | {model:25s} | {colorway:30s} | Size {size:4.1f} | ${price:6.2f} | {condition}")
-
-print("\n" + "=" * 60)
-print("TEST COMPLETED SUCCESSFULLY!")
-print(f"User '{username}' can now login with password '{password}'")
-print("=" * 60)
-
-# Close connection
-cur.close()
-conn.close()
+    Args:
+        cur: Database cursor object
+        conn: Database connection object for committing changes
+    """
+    # ==========================
+    # USER INPUT
+    # ==========================
+    print("=" * 60)
+    print("SHOE DATABASE - Random Collection Generator")
+    print("=" * 60)
+
+    username = input("\nEnter username for new test user: ").strip()
+    password = getpass("Enter password for new test user: ").strip()
+
+    if not username or not password:
+        print("Error: Username and password cannot be empty!")
+        exit(1)
+
+    print("\n" + "=" * 60)
+    print(f"Creating User: '{username}'")
+    print("=" * 60)
+
+    # Hash the password before opening the transaction so no locks are held meanwhile
+    email = f"{username}@test.com"
+    plain_password = password.encode("utf-8")
+    hashed_password = bcrypt.hashpw(plain_password, bcrypt.gensalt(rounds=TEST_BCRYPT_COST))
+
+    # Steps 1-3 run as one transaction: a single commit on success, rolled back on error
+    with conn:
+        # Step 1: Clean up - Delete user if exists (ON DELETE CASCADE removes their shoes)
+        print("\n[1] Cleaning up existing test data...")
+        cur.execute("DELETE FROM users WHERE username = %s", (username,))
+        print("[OK] Cleanup complete")
+
+        # Step 2: Create user with provided credentials
+        print(f"\n[2] Creating user '{username}'...")
+        cur.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id", 
+                    (username, email, hashed_password))
+        user_id = cur.fetchone()[0]
+        print(f"[OK] User created with ID: {user_id}")
+
+        # Step 3: Generate and add random shoes
+        print("\n[3] Generating 20 random shoes with at least 2 sets of duplicates...")
+        shoes_data = pick_random_shoes(num_shoes=20, num_duplicates=2)
+
+        print("[3] Adding shoes to collection...")
+        # Insert every shoe in a single statement instead of one round-trip per shoe
+        rows = [(user_id, *shoe) for shoe in shoes_data]
+        execute_values(
+            cur,
+            "INSERT INTO shoes (user_id, brand, model, colorway, size, price, image, condition) VALUES %s",
+            rows,
+            page_size=100
+        )
+
+        added_lines = [
+            f"  [{i}/20] Added: {brand} {model} - {colorway} (Size {size}, ${price}, {condition})"
+            for i, (brand, model, colorway, size, price, image, condition) in enumerate(shoes_data, 1)
+        ]
+        sys.stdout.write("\n".join(added_lines) + "\n")
+
+    print("[OK] All 20 shoes added successfully")
+
+    # Step 4: Display summary statistics
+    print("\n[4] Collection Summary:")
+    print("-" * 60)
+
+    # Both summaries come from one small per-model aggregate; the brand totals are
+    # summed from it instead of running a second GROUP BY
+    cur.execute("""
+        SELECT brand, model, COUNT(*) as count
+        FROM shoes
+        WHERE user_id = %s
+        GROUP BY brand, model
+        ORDER BY brand, model
+    """, (user_id,))
+
+    brand_counts = Counter()
+    model_counts = Counter()
+    for brand, model, count in cur:
+        brand_counts[brand] += count
+        model_counts[(brand, model)] = count
+
+    # most_common() keeps first-seen order for ties, i.e. brand/model order
+    brand_lines = [f"  • {brand}: {count} pairs" for brand, count in brand_counts.most_common()]
+    sys.stdout.write("\nShoes by Brand:\n" + "\n".join(brand_lines) + "\n")
+
+    model_lines = [
+        f"  • {brand} {model}: {count} pairs [DUPLICATE]" if count > 1 else f"  • {brand} {model}: {count} pair"
+        for (brand, model), count in model_counts.most_common()
+    ]
+    sys.stdout.write("\nShoes by Model (showing duplicates):\n" + "\n".join(model_lines) + "\n")
+
+    # Stream the collection through a server-side cursor so only one batch of rows
+    # is held at a time, writing out each batch of the inventory as it arrives
+    print("\nComplete Inventory:")
+    print("-" * 60)
+    with conn.cursor(name="inventory_stream") as inventory_cur:
+        inventory_cur.itersize = 500
+        inventory_cur.execute("""
+            SELECT brand, model, colorway, size, price, condition
+            FROM shoes
+            WHERE user_id = %s
+            ORDER BY brand, model, colorway
+        """, (user_id,))
+
+        i = 0
+        batch = inventory_cur.fetchmany(inventory_cur.itersize)
+        while batch:
+            lines = []
+            for brand, model, colorway, size, price, condition in batch:
+                i += 1
+                lines.append(f"{i:2d}. {brand:12s} | {model:25s} | {colorway:30s} | Size {size:4.1f} | ${price:6.2f} | {condition}")
+            sys.stdout.write("\n".join(lines) + "\n")
+            batch = inventory_cur.fetchmany(inventory_cur.itersize)
+
+    print("\n" + "=" * 60)
+    print("TEST COMPLETED SUCCESSFULLY!")
+    print(f"User '{username}' can now login with password '{password}'")
+    print("=" * 60)
+
+
+# A "guard" that only runs the generator if the script is executed directly
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,15 @@
 Input validation utilities for the Shoe Database application.
 """
 
+import re
+from functools import lru_cache
+
+# Basic email shape: one @, no whitespace, and a dot in the domain
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Plain decimal number, e.g. "10", "-2", "9.5", ".5"
+_FLOAT_RE = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)$")
+
 
 def get_valid_float(prompt, min_value=None, max_value=None, allow_empty=False):
     """
@@ -27,13 +36,13 @@ def get_valid_float(prompt, min_value=None, max_value=None, allow_empty=False):
                 print("Error: Input cannot be empty. Please enter a number.")
                 continue
         
-        # Try to convert to float
-        try:
-            value = float(user_input)
-        except ValueError:
+        # Check the format first so bad input doesn't go through a ValueError
+        if not _FLOAT_RE.match(user_input):
             print(f"Error: '{user_input}' is not a valid number. Please try again.")
             continue
         
+        value = float(user_input)
+        
         # Validate range
         if min_value is not None and value < min_value:
             print(f"Error: Value must be at least {min_value}. Please try again.")
@@ -93,17 +102,21 @@ def get_valid_choice(prompt, valid_choices):
     Returns:
         str: Valid choice selected by user
     """
+    choices = frozenset(valid_choices)
+    
     while True:
         user_input = input(prompt).strip()
         
-        if user_input in valid_choices:
+        if user_input in choices:
             return user_input
         else:
             print(f"Error: Invalid choice. Please select from: {', '.join(valid_choices)}")
 
+@lru_cache(maxsize=256)
 def validate_email_format(email):
     """
     Basic email format validation.
+    Results are cached, since re-prompts often re-check the same address.
     
     Args:
         email: Email string to validate
@@ -111,19 +124,8 @@ def validate_email_format(email):
     Returns:
         bool: True if email format is valid, False otherwise
     """
-    # Basic validation: contains @ and . after @
-    if '@' not in email:
-        return False
-    
-    local, domain = email.rsplit('@', 1)
-    
-    if not local or not domain:
-        return False
-        
-    if '.' not in domain:
-        return False
-    
-    return True
+    # Basic validation: single pass over the string with a precompiled pattern
+    return _EMAIL_RE.match(email) is not None
 
 
 def get_valid_email(prompt):